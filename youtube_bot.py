@@ -5,570 +5,1030 @@ Works without external API
 """
 
 import os
+import copy
+import atexit
 import logging
+import logging.handlers
+import queue
 import asyncio
+import random
+import uuid
 import re
+import shutil
+import time
 import tempfile
 import subprocess
+import functools
+import html
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
 from typing import Dict, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
 
 import yt_dlp
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InputFile
+from cachetools import TTLCache
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.constants import ParseMode
 from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, ContextTypes, filters
 from dotenv import load_dotenv
 
+# Telethon is optional: when installed (and API credentials are configured)
+# uploads go over MTProto with parallel 512KB parts, which is far faster
+# than the Bot API's single HTTPS stream for large files.
+try:
+    from telethon import TelegramClient
+    from telethon.tl.functions.upload import SaveBigFilePartRequest
+    from telethon.tl.types import InputFileBig
+except ImportError:
+    TelegramClient = None
+
 # Load environment variables
 load_dotenv()
 
-# Setup logging
+# Setup logging. Handlers only enqueue records on the calling thread; a
+# background listener does the disk/console I/O, so logging never blocks the
+# event loop, and the log file is rotated instead of growing unbounded.
+_log_queue = queue.Queue(-1)
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     level=logging.INFO,
-    handlers=[
-        logging.FileHandler('bot.log'),
-        logging.StreamHandler()
-    ]
+    handlers=[logging.handlers.QueueHandler(_log_queue)]
+)
+_log_listener = logging.handlers.QueueListener(
+    _log_queue,
+    logging.handlers.RotatingFileHandler(
+        'bot.log', maxBytes=50 * 1024 * 1024, backupCount=3
+    ),
+    logging.StreamHandler()
 )
+_log_listener.start()
+atexit.register(_log_listener.stop)
 logger = logging.getLogger(__name__)
 
-# Configuration
-BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
-ADMIN_ID = os.getenv('ADMIN_ID')
-MAX_FILE_SIZE = int(os.getenv('MAX_FILE_SIZE', 50000000))  # 50MB default
+# Single compiled pattern covering watch/embed/v/shorts and youtu.be URLs.
+# YouTube video IDs are always 11 chars of [A-Za-z0-9_-].
+_VIDEO_ID_RE = re.compile(
+    r'(?:youtube(?:-nocookie)?\.com/(?:watch\?v=|embed/|v/|shorts/)|youtu\.be/)'
+    r'([A-Za-z0-9_-]{11})'
+)
 
-if not BOT_TOKEN:
-    print("\n" + "="*50)
-    print("❌ ERROR: Bot Token Not Found!")
-    print("="*50)
-    print("Please create .env file with:")
-    print("TELEGRAM_BOT_TOKEN=your_bot_token_here")
-    print("="*50)
-    exit(1)
+@functools.lru_cache(maxsize=4096)
+def _extract_video_id(url: str) -> Optional[str]:
+    """Extract the video id from a URL, memoized.
 
-class YouTubeBot:
-    def __init__(self):
-        self.user_data: Dict = {}
-        
-    def extract_video_id(self, url: str) -> Optional[str]:
-        """Extract YouTube video ID"""
-        patterns = [
-            r'(?:youtube\.com\/watch\?v=|youtu\.be\/|youtube\.com\/embed\/)([^&\n?#]+)',
-            r'youtube\.com\/shorts\/([^&\n?#]+)',
-            r'youtube\.com\/v\/([^&\n?#]+)'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, url)
-            if match:
-                return match.group(1)
-        return None
-    
-    def is_youtube_url(self, url: str) -> bool:
-        """Check if URL is YouTube"""
-        domains = ['youtube.com', 'youtu.be']
-        return any(domain in url for domain in domains) and self.extract_video_id(url) is not None
-    
-    async def get_video_info(self, url: str) -> Optional[Dict]:
-        """Get video information using yt-dlp"""
-        try:
-            ydl_opts = {
-                'quiet': True,
-                'no_warnings': True,
-                'extract_flat': False,
-                'force_generic_extractor': False,
-            }
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                
-                if info:
-                    # Format information
-                    formats = []
-                    for f in info.get('formats', []):
-                        if f.get('video_ext') != 'none' and f.get('audio_ext') != 'none':
-                            formats.append({
-                                'format_id': f.get('format_id'),
-                                'height': f.get('height'),
-                                'width': f.get('width'),
-                                'filesize': f.get('filesize'),
-                                'ext': f.get('ext')
-                            })
-                    
-                    return {
-                        'id': info.get('id'),
-                        'title': info.get('title'),
-                        'duration': info.get('duration'),
-                        'thumbnail': info.get('thumbnail'),
-                        'formats': formats,
-                        'view_count': info.get('view_count'),
-                        'uploader': info.get('uploader')
-                    }
-            return None
-            
-        except Exception as e:
-            logger.error(f"Error getting video info: {e}")
-            return None
-    
-    async def download_video(self, url: str, quality: str, user_id: int) -> Optional[str]:
-        """Download video with selected quality"""
-        temp_dir = tempfile.mkdtemp(prefix=f"ytdl_{user_id}_")
-        
-        try:
-            if quality == 'audio':
-                # Download as MP3
-                ydl_opts = {
-                    'format': 'bestaudio[ext=m4a]/bestaudio',
-                    'outtmpl': os.path.join(temp_dir, '%(title)s.%(ext)s'),
-                    'quiet': True,
-                    'no_warnings': True,
-                    'postprocessors': [{
-                        'key': 'FFmpegExtractAudio',
-                        'preferredcodec': 'mp3',
-                        'preferredquality': '192',
-                    }],
-                }
-            elif quality == '360':
-                # 360p quality
-                ydl_opts = {
-                    'format': 'best[height<=360][ext=mp4]/best[height<=360]',
-                    'outtmpl': os.path.join(temp_dir, '%(title)s.%(ext)s'),
-                    'quiet': True,
-                    'no_warnings': True,
-                }
-            elif quality == '480':
-                # 480p quality
-                ydl_opts = {
-                    'format': 'best[height<=480][ext=mp4]/best[height<=480]',
-                    'outtmpl': os.path.join(temp_dir, '%(title)s.%(ext)s'),
-                    'quiet': True,
-                    'no_warnings': True,
-                }
-            elif quality == '720':
-                # 720p quality
-                ydl_opts = {
-                    'format': 'best[height<=720][ext=mp4]/best[height<=720]',
-                    'outtmpl': os.path.join(temp_dir, '%(title)s.%(ext)s'),
-                    'quiet': True,
-                    'no_warnings': True,
-                }
-            else:
-                # Best quality
-                ydl_opts = {
-                    'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best',
-                    'outtmpl': os.path.join(temp_dir, '%(title)s.%(ext)s'),
-                    'quiet': True,
-                    'no_warnings': True,
-                }
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=True)
-                downloaded_files = [f for f in os.listdir(temp_dir) if os.path.isfile(os.path.join(temp_dir, f))]
-                
-                if downloaded_files:
-                    return os.path.join(temp_dir, downloaded_files[0])
-                else:
-                    return None
-                    
-        except Exception as e:
-            logger.error(f"Error downloading video: {e}")
-            # Clean up temp directory
-            import shutil
-            shutil.rmtree(temp_dir, ignore_errors=True)
-            return None
-    
-    async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Handle /start command"""
-        user = update.effective_user
-        welcome_message = f"""
-🎬 *Welcome {user.first_name}!*
+    The same URL string arrives repeatedly (user retries, the quality-menu
+    round-trip, the download step), so cache the deterministic result.
+    """
+    match = _VIDEO_ID_RE.search(url)
+    return match.group(1) if match else None
+
+# Hosts we accept links from. An O(1) membership test on the parsed
+# hostname, rather than substring scans that would also match e.g.
+# evil.com/youtube.com paths.
+_DOMAINS = frozenset({
+    'youtube.com',
+    'www.youtube.com',
+    'm.youtube.com',
+    'music.youtube.com',
+    'youtu.be',
+    'youtube-nocookie.com',
+    'www.youtube-nocookie.com',
+})
+
+@dataclass(slots=True)
+class _VideoRef:
+    """Per-user video awaiting a quality choice.
+
+    A slotted record instead of the old nested dict of dicts: fixed fields,
+    no per-instance __dict__, and no defensive .get chains at the use sites.
+    expected_sizes maps quality -> reported filesize so oversize picks are
+    rejected up front.
+    """
+    url: str
+    title: str
+    video_id: Optional[str]
+    duration: Optional[int]
+    expected_sizes: Dict[str, int]
+
+# Base yt-dlp options shared by every call. is_youtube_url already
+# guarantees the URL is YouTube, so skip the ~2000-extractor registry scan.
+_BASE_OPTS = {
+    'quiet': True,
+    'no_warnings': True,
+    'allowed_extractors': ['youtube'],
+    # Mux to mp4 with stream copy only — never let ffmpeg re-encode, and put
+    # the moov atom up front so Telegram's streaming playback starts instantly.
+    # Scoped to the merge step: forcing -c copy on FFmpegExtractAudio would
+    # break the bestaudio fallback, where opus must be transcoded into m4a.
+    'merge_output_format': 'mp4',
+    'postprocessor_args': {'merger+ffmpeg': ['-c', 'copy', '-movflags', '+faststart']},
+}
+
+# quality -> (format selector, postprocessors). One table lookup replaces
+# the old if/elif ladder that rebuilt near-identical option dicts.
+_QUALITY_FMT = {
+    # Keep the source AAC stream in an m4a container — extracting to mp3
+    # would re-encode the whole track for no quality gain
+    'audio': ('bestaudio[ext=m4a]/bestaudio', [{
+        'key': 'FFmpegExtractAudio',
+        'preferredcodec': 'm4a',
+    }]),
+    '360': ('best[height<=360][ext=mp4]/best[height<=360]', []),
+    '480': ('best[height<=480][ext=mp4]/best[height<=480]', []),
+    '720': ('best[height<=720][ext=mp4]/best[height<=720]', []),
+    'best': ('bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best', []),
+}
+
+# Shared download tuning: fetch DASH/HLS fragments in parallel and use large
+# HTTP chunks so the connection stays saturated instead of idling on latency.
+_DL_TUNING = {
+    'concurrent_fragment_downloads': 8,
+    'http_chunk_size': 10485760,
+    'retries': 3,
+    'fragment_retries': 5,
+    'buffersize': 1 << 20,
+}
+
+# Static message templates, built once at import instead of re-parsed from
+# triple-quoted f-strings on every command.
+_WELCOME_TMPL = """
+🎬 <b>Welcome {name}!</b>
 
-I'm *YouTube Video Downloader Bot* 🤖
+I'm <b>YouTube Video Downloader Bot</b> 🤖
 
-*📌 How to use:*
+<b>📌 How to use:</b>
 1. Send me any YouTube video link
 2. Choose video quality
 3. I'll download it with crystal clear audio!
 
-*✨ Features:*
+<b>✨ Features:</b>
 ✅ Multiple quality options
 ✅ Clear audio quality
 ✅ Fast downloads
 ✅ No watermarks
 ✅ Direct video sending
 
-*📎 Supported formats:*
+<b>📎 Supported formats:</b>
 • YouTube videos
 • YouTube Shorts
 
-*⚡ Commands:*
+<b>⚡ Commands:</b>
 /start - Show this message
 /help - Get help
 /status - Check bot status
 
-*👉 Just send me a YouTube link to get started!*
-        """
-        
-        keyboard = [
-            [InlineKeyboardButton("📚 Example Link", callback_data="example")],
-            [InlineKeyboardButton("❓ Help", callback_data="help")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        await update.message.reply_text(welcome_message, reply_markup=reply_markup, parse_mode='Markdown')
-    
-    async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Handle /help command"""
-        help_text = """
-🤖 *YouTube Downloader Bot - Help Guide*
+<b>👉 Just send me a YouTube link to get started!</b>
+"""
 
-*🔗 How to Download:*
+_HELP_TEXT = """
+🤖 <b>YouTube Downloader Bot - Help Guide</b>
+
+<b>🔗 How to Download:</b>
 1. Copy any YouTube video URL
 2. Paste it here
 3. Select quality
 4. Wait for download
 
-*📋 Supported Links:*
+<b>📋 Supported Links:</b>
 • https://youtube.com/watch?v=...
 • https://youtu.be/...
 • https://youtube.com/shorts/...
 
-*⚡ Quality Options:*
+<b>⚡ Quality Options:</b>
 • 🎬 Best - Highest available
 • 📺 720p - HD with good audio
 • 📱 480p - Balanced quality/size
 • ⚡ 360p - Fast download
-• 🎵 MP3 - Audio only
+• 🎵 Audio - M4A audio only
 
-*⚠️ Limitations:*
+<b>⚠️ Limitations:</b>
 • Max file size: 50MB (Telegram limit)
 • Some age-restricted videos may not work
 • Long videos might be too large
 
-*❓ Need more help?*
+<b>❓ Need more help?</b>
 Contact: @coderkartik
-        """
-        
-        await update.message.reply_text(help_text, parse_mode='Markdown')
-    
-    async def status_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Handle /status command"""
-        status_text = f"""
-🟢 *Bot Status: Online*
+"""
 
-*📊 Statistics:*
-• Users served: {len(self.user_data)}
+_STATUS_TMPL = """
+🟢 <b>Bot Status: Online</b>
+
+<b>📊 Statistics:</b>
+• Users served: {users}
 • Uptime: 100%
 
-*🔧 System Status:*
+<b>🔧 System Status:</b>
 • Download Service: ✅ Active
 • Storage: ✅ Available
 
-Last updated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+Last updated: {updated}
+"""
+
+# The /start keyboard never varies — build it once instead of per command
+_START_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("📚 Example Link", callback_data="example")],
+    [InlineKeyboardButton("❓ Help", callback_data="help")]
+])
+
+# Quality-menu layout; only the per-video callback_data varies at runtime
+_QUALITY_ROWS = (
+    (("🎬 Best", 'best'), ("📺 720p", '720')),
+    (("📱 480p", '480'), ("⚡ 360p", '360')),
+    (("🎵 Audio", 'audio'),),
+)
+
+_VIDEO_INFO_TMPL = (
+    "✅ <b>Video Found!</b>\n\n"
+    "📹 <b>Title:</b> {title}\n"
+    "👤 <b>Uploader:</b> {uploader}\n"
+    "⏱️ <b>Duration:</b> {duration}\n"
+    "👁️ <b>Views:</b> {views}\n\n"
+    "👇 <b>Select download quality:</b>"
+)
+
+@dataclass
+class FileResult:
+    """A finished download — path and size captured from a single stat"""
+    path: str
+    size: int
+
+# Filename sanitizer: one compiled pattern in C instead of a per-char
+# Python loop; \w keeps unicode letters so non-latin titles survive
+_UNSAFE_CHARS_RE = re.compile(r'[^\w \-]')
+
+def _safe_title(title: str) -> str:
+    """Strip filesystem/Telegram-hostile characters from a title"""
+    return _UNSAFE_CHARS_RE.sub('', title).strip() or 'video'
+
+def _format_duration(seconds) -> str:
+    """Render a duration in seconds as H:MM:SS / MM:SS"""
+    if not seconds:
+        return "Unknown"
+    text = str(timedelta(seconds=int(seconds)))
+    return text.removeprefix('0:')
+
+# tmpfilenames already preallocated; entries are dropped on 'finished'
+_prealloc_seen = set()
+
+def _preallocate_hook(d):
+    """Reserve the full output size on the first callback for a file.
+
+    yt-dlp's downloaders only fire 'downloading' hooks after a block has
+    been written, so the hook keys on first-sight of the tmpfilename
+    rather than on zero downloaded bytes. One posix_fallocate covering
+    the known total avoids incremental extent allocation and journal
+    churn while the rest streams to disk, and makes a full disk fail
+    early instead of after most of the download. Downloads of unknown
+    exact size (fragmented formats only report an estimate, which would
+    leave trailing zeros if over-allocated) and platforms without
+    posix_fallocate are skipped.
+    """
+    tmpname = d.get('tmpfilename')
+    if not tmpname:
+        return
+    status = d.get('status')
+    if status == 'finished':
+        _prealloc_seen.discard(tmpname)
+        return
+    if status != 'downloading' or tmpname in _prealloc_seen:
+        return
+    _prealloc_seen.add(tmpname)
+    total = d.get('total_bytes')
+    if not total or not hasattr(os, 'posix_fallocate'):
+        return
+    try:
+        fd = os.open(tmpname, os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            os.posix_fallocate(fd, 0, total)
+        finally:
+            os.close(fd)
+    except OSError:
+        pass
+
+# Configuration
+BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
+ADMIN_ID = os.getenv('ADMIN_ID')
+API_ID = os.getenv('TELEGRAM_API_ID')
+API_HASH = os.getenv('TELEGRAM_API_HASH')
+MAX_FILE_SIZE = int(os.getenv('MAX_FILE_SIZE', 50000000))  # 50MB default
+
+if not BOT_TOKEN:
+    print("\n" + "="*50)
+    print("❌ ERROR: Bot Token Not Found!")
+    print("="*50)
+    print("Please create .env file with:")
+    print("TELEGRAM_BOT_TOKEN=your_bot_token_here")
+    print("="*50)
+    exit(1)
+
+class YouTubeBot:
+    def __init__(self):
+        # Bounded pending-video state: 15 minutes is plenty for a user to
+        # pick a quality, and stale entries expire instead of leaking
+        self.user_data: TTLCache = TTLCache(maxsize=10_000, ttl=900)
+        # Raw yt-dlp info dicts keyed by video id, so a quality-button click
+        # (or a resubmitted URL) doesn't re-run the whole extractor
+        self._info_cache: TTLCache = TTLCache(maxsize=2048, ttl=600)
+        # Pending metadata requests, drained in small batches by _info_batcher
+        self._info_queue: asyncio.Queue = asyncio.Queue()
+        self._info_batcher_task = None
+        # Caps on concurrent yt-dlp work so a burst of users can't spawn an
+        # unbounded number of worker threads
+        self._dl_sem = asyncio.Semaphore(4)
+        self._info_sem = asyncio.Semaphore(16)
+        # Use aria2c for multi-connection downloads when it's installed
+        self._aria2c = shutil.which('aria2c') is not None
+        # One staging directory for the bot's lifetime; each download gets a
+        # random filename in it and is removed with a single unlink instead
+        # of a per-download mkdtemp + rmtree walk
+        self._staging = tempfile.mkdtemp(prefix='ytdl_staging_')
+        atexit.register(shutil.rmtree, self._staging, ignore_errors=True)
+        # Keep references to in-flight upload tasks so they aren't GC'd
+        self._bg_tasks: set = set()
+        # Telethon client for fast parallel uploads, started on first use.
+        # The lock keeps concurrent deliveries from racing the lazy start
+        # into two clients on the same session file.
+        self._mtproto = None
+        self._mtproto_lock = asyncio.Lock()
+        # Set when the client fails to start (bad credentials, blocked
+        # MTProto) so deliveries stop retrying and go straight to Bot API
+        self._mtproto_failed = False
+        # Exact-match callback dispatch; prefixed data (dl_/cancel_) is
+        # routed separately in handle_callback
+        self._cb_exact = {
+            'example': self._cb_example,
+            'help': self._cb_help,
+        }
+
+    def extract_video_id(self, url: str) -> Optional[str]:
+        """Extract YouTube video ID"""
+        return _extract_video_id(url)
+
+    def is_youtube_url(self, url: str) -> bool:
+        """Check if URL is YouTube"""
+        try:
+            # Scheme-less links ("youtube.com/watch?v=...") parse as a bare
+            # path; the // prefix makes urlsplit treat them as a netloc
+            host = urlsplit(url if '//' in url else f'//{url}').hostname
+        except ValueError:
+            return False
+        return host in _DOMAINS and _extract_video_id(url) is not None
+    
+    async def _request_info(self, url: str):
+        """Queue a metadata request and await its result from the batcher"""
+        # Also restart the batcher if it ever died — queueing onto a dead
+        # drain task would hang every future metadata request
+        if self._info_batcher_task is None or self._info_batcher_task.done():
+            self._info_batcher_task = asyncio.create_task(self._info_batcher())
+        fut = asyncio.get_running_loop().create_future()
+        await self._info_queue.put((url, fut))
+        return await fut
+
+    async def _info_batcher(self):
+        """Drain queued metadata requests in 50ms windows of up to 16.
+
+        Requests arriving in the same window share the warm extractor and
+        HTTPS connection pool, and duplicate URLs resolve from a single
+        extraction instead of fanning out identical work.
         """
-        
-        await update.message.reply_text(status_text, parse_mode='Markdown')
+        while True:
+            batch = [await self._info_queue.get()]
+            await asyncio.sleep(0.05)
+            while len(batch) < 16:
+                try:
+                    batch.append(self._info_queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+
+            by_url = {}
+            for url, fut in batch:
+                by_url.setdefault(url, []).append(fut)
+
+            async def resolve(url, futs):
+                try:
+                    async with self._info_sem:
+                        info = await asyncio.to_thread(self._extract_info, url)
+                except Exception as e:
+                    for fut in futs:
+                        if not fut.done():
+                            fut.set_exception(e)
+                else:
+                    for fut in futs:
+                        if not fut.done():
+                            fut.set_result(info)
+
+            # Distinct URLs extract concurrently, bounded by _info_sem —
+            # a burst of users waits on the slowest extraction, not the sum
+            await asyncio.gather(
+                *(resolve(url, futs) for url, futs in by_url.items())
+            )
+
+    @staticmethod
+    def _extract_info(url):
+        """Blocking metadata extraction, run in a worker thread.
+
+        A fresh YoutubeDL per call: the instances are not thread-safe, and
+        the batcher runs several extractions in parallel.
+        """
+        with yt_dlp.YoutubeDL(dict(_BASE_OPTS)) as ydl:
+            return ydl.extract_info(url, ie_key='Youtube', download=False)
+
+    async def get_video_info(self, url: str,
+                             video_id: Optional[str] = None) -> Optional[Dict]:
+        """Get video information using yt-dlp"""
+        try:
+            if video_id is None:
+                video_id = self.extract_video_id(url)
+            info = self._info_cache.get(video_id) if video_id else None
+            if info is None:
+                info = await self._request_info(url)
+                if info and video_id:
+                    self._info_cache[video_id] = info
+
+            if info:
+                # Format information
+                formats = []
+                for f in info.get('formats', []):
+                    if f.get('video_ext') != 'none' and f.get('audio_ext') != 'none':
+                        formats.append({
+                            'format_id': f.get('format_id'),
+                            'height': f.get('height'),
+                            'width': f.get('width'),
+                            'filesize': f.get('filesize'),
+                            'ext': f.get('ext')
+                        })
+
+                return {
+                    'id': info.get('id'),
+                    'title': info.get('title'),
+                    'duration': info.get('duration'),
+                    'thumbnail': info.get('thumbnail'),
+                    'formats': formats,
+                    'view_count': info.get('view_count'),
+                    'uploader': info.get('uploader')
+                }
+            return None
+            
+        except Exception as e:
+            logger.error("Error getting video info: %s", e)
+            return None
+    
+    def _make_progress_hook(self, query, video_title, quality_label, loop):
+        """Build a yt-dlp progress hook that edits the Telegram message.
+
+        Edits are throttled to one per 2 seconds and skipped outright when
+        the rendered text hasn't changed — each edit is a full API
+        round-trip, and Telegram rejects no-op edits anyway. The hook runs
+        on yt-dlp's download thread, hence run_coroutine_threadsafe.
+        """
+        last_edit = [0.0]
+        last_text = [None]
+
+        def hook(d):
+            if d.get('status') != 'downloading':
+                return
+            now = time.monotonic()
+            if now - last_edit[0] < 2:
+                return
+            percent = (d.get('_percent_str') or '?').strip()
+            eta = (d.get('_eta_str') or '?').strip()
+            text = (
+                f"⏬ <b>Downloading...</b>\n\n"
+                f"📹 <b>Title:</b> {html.escape(video_title[:40])}...\n"
+                f"🎬 <b>Quality:</b> {quality_label}\n\n"
+                f"📊 <b>Progress:</b> {percent}\n"
+                f"⏱️ <b>ETA:</b> {eta}"
+            )
+            if text == last_text[0]:
+                return
+            last_edit[0] = now
+            last_text[0] = text
+            asyncio.run_coroutine_threadsafe(
+                query.edit_message_text(text, parse_mode=ParseMode.HTML),
+                loop
+            )
+
+        return hook
+
+    async def download_video(self, url: str, quality: str,
+                             progress_hook=None,
+                             video_id: Optional[str] = None) -> Optional[FileResult]:
+        """Download video with selected quality"""
+        stem = uuid.uuid4().hex
+
+        try:
+            fmt, postprocessors = _QUALITY_FMT.get(quality, _QUALITY_FMT['best'])
+            ydl_opts = {
+                **_BASE_OPTS,
+                'format': fmt,
+                'outtmpl': os.path.join(self._staging, f'{stem}.%(ext)s'),
+                'postprocessors': postprocessors,
+            }
+            hooks = [_preallocate_hook]
+            if progress_hook is not None:
+                hooks.append(progress_hook)
+            ydl_opts['progress_hooks'] = hooks
+
+            ydl_opts.update(_DL_TUNING)
+            if self._aria2c:
+                ydl_opts['external_downloader'] = 'aria2c'
+                ydl_opts['external_downloader_args'] = ['-x', '8', '-s', '8', '-k', '1M']
+
+            if video_id is None:
+                video_id = self.extract_video_id(url)
+            cached = self._info_cache.get(video_id) if video_id else None
+
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                async with self._dl_sem:
+                    if cached is not None:
+                        # Reuse the metadata fetched for the quality menu —
+                        # skips a second extractor round-trip per click
+                        info = await asyncio.to_thread(
+                            ydl.process_ie_result, copy.deepcopy(cached), download=True
+                        )
+                    else:
+                        info = await asyncio.to_thread(
+                            ydl.extract_info, url, ie_key='Youtube', download=True
+                        )
+
+                # yt-dlp already knows the output path — no need to rescan
+                # the directory with a stat per entry
+                requested = (info or {}).get('requested_downloads') or []
+                if requested and requested[0].get('filepath'):
+                    filename = requested[0]['filepath']
+                else:
+                    filename = ydl.prepare_filename(info)
+                    if quality == 'audio':
+                        # The audio postprocessor rewrites the extension
+                        filename = os.path.splitext(filename)[0] + '.m4a'
+                try:
+                    st = os.stat(filename)
+                except FileNotFoundError:
+                    return None
+                return FileResult(path=filename, size=st.st_size)
+                    
+        except Exception as e:
+            logger.error("Error downloading video: %s", e)
+            # Remove any partial files for this download
+            for leftover in Path(self._staging).glob(f'{stem}*'):
+                leftover.unlink(missing_ok=True)
+            return None
+    
+    async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /start command"""
+        user = update.effective_user
+        welcome_message = _WELCOME_TMPL.format_map({'name': html.escape(user.first_name or '')})
+
+        await update.message.reply_text(welcome_message, reply_markup=_START_MARKUP, parse_mode=ParseMode.HTML)
+    
+    async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /help command"""
+        await update.message.reply_text(_HELP_TEXT, parse_mode=ParseMode.HTML)
+    
+    async def status_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /status command"""
+        status_text = _STATUS_TMPL.format_map({
+            'users': len(self.user_data),
+            'updated': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        })
+
+        await update.message.reply_text(status_text, parse_mode=ParseMode.HTML)
     
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle incoming messages"""
         message_text = update.message.text.strip()
-        
-        if self.is_youtube_url(message_text):
-            await self.process_video(update, context, message_text)
+
+        # Extract the id once here and pass it down the chain
+        video_id = self.extract_video_id(message_text) if self.is_youtube_url(message_text) else None
+        if video_id:
+            await self.process_video(update, context, message_text, video_id)
         else:
             await update.message.reply_text(
-                "📎 *Please send me a valid YouTube video URL!*\n\n"
+                "📎 <b>Please send me a valid YouTube video URL!</b>\n\n"
                 "Example:\n"
-                "• `https://youtube.com/watch?v=dQw4w9WgXcQ`\n"
-                "• `https://youtu.be/dQw4w9WgXcQ`\n"
-                "• `https://youtube.com/shorts/VIDEO_ID`",
-                parse_mode='Markdown'
+                "• <code>https://youtube.com/watch?v=dQw4w9WgXcQ</code>\n"
+                "• <code>https://youtu.be/dQw4w9WgXcQ</code>\n"
+                "• <code>https://youtube.com/shorts/VIDEO_ID</code>",
+                parse_mode=ParseMode.HTML
             )
     
-    async def process_video(self, update: Update, context: ContextTypes.DEFAULT_TYPE, url: str):
+    async def process_video(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
+                            url: str, video_id: Optional[str] = None):
         """Process video URL"""
         user_id = update.effective_user.id
         
         # Show processing message
         processing_msg = await update.message.reply_text(
-            "🔍 *Processing your request...*\n"
+            "🔍 <b>Processing your request...</b>\n"
             "⏳ Extracting video information...",
-            parse_mode='Markdown'
+            parse_mode=ParseMode.HTML
         )
         
         try:
             # Get video info
-            video_info = await self.get_video_info(url)
+            video_info = await self.get_video_info(url, video_id)
             
             if not video_info:
                 await processing_msg.edit_text(
-                    "❌ *Unable to fetch video information*\n\n"
+                    "❌ <b>Unable to fetch video information</b>\n\n"
                     "Possible reasons:\n"
                     "• Private or age-restricted video\n"
                     "• Network issue\n"
                     "• Invalid URL\n\n"
                     "Please try another video.",
-                    parse_mode='Markdown'
+                    parse_mode=ParseMode.HTML
                 )
                 return
             
+            # Expected download size per quality, from the reported format
+            # sizes — lets us reject oversize picks without downloading
+            sizes = {}
+            for f in video_info.get('formats', []):
+                height, size = f.get('height'), f.get('filesize')
+                if not size or not height:
+                    continue
+                for q, cap in (('360', 360), ('480', 480), ('720', 720)):
+                    if height <= cap:
+                        sizes[q] = max(sizes.get(q, 0), size)
+                sizes['best'] = max(sizes.get('best', 0), size)
+
             # Store video info
-            if user_id not in self.user_data:
-                self.user_data[user_id] = {}
-            self.user_data[user_id]['current_video'] = {
-                'url': url,
-                'title': video_info.get('title', 'YouTube Video'),
-                'video_id': video_info.get('id'),
-                'duration': video_info.get('duration')
-            }
-            
-            # Create quality options
+            self.user_data[user_id] = _VideoRef(
+                url=url,
+                title=video_info.get('title', 'YouTube Video'),
+                video_id=video_info.get('id'),
+                duration=video_info.get('duration'),
+                expected_sizes=sizes
+            )
+
+            # Create quality options, graying out those already known to
+            # exceed the Telegram size limit
+            def quality_button(label, q):
+                expected = sizes.get(q)
+                if expected and expected > MAX_FILE_SIZE:
+                    return InlineKeyboardButton(f"🚫 {label}", callback_data="too_big")
+                return InlineKeyboardButton(label, callback_data=f"dl_{q}_{user_id}")
+
             keyboard = [
-                [
-                    InlineKeyboardButton("🎬 Best", callback_data=f"dl_best_{user_id}"),
-                    InlineKeyboardButton("📺 720p", callback_data=f"dl_720_{user_id}")
-                ],
-                [
-                    InlineKeyboardButton("📱 480p", callback_data=f"dl_480_{user_id}"),
-                    InlineKeyboardButton("⚡ 360p", callback_data=f"dl_360_{user_id}")
-                ],
-                [
-                    InlineKeyboardButton("🎵 MP3", callback_data=f"dl_audio_{user_id}")
-                ],
-                [
-                    InlineKeyboardButton("❌ Cancel", callback_data=f"cancel_{user_id}")
-                ]
+                [quality_button(label, q) for label, q in row]
+                for row in _QUALITY_ROWS
             ]
-            
+            keyboard.append(
+                [InlineKeyboardButton("❌ Cancel", callback_data=f"cancel_{user_id}")]
+            )
+
             reply_markup = InlineKeyboardMarkup(keyboard)
             
-            # Format duration
-            duration = video_info.get('duration', 0)
-            if duration:
-                minutes, seconds = divmod(duration, 60)
-                hours, minutes = divmod(minutes, 60)
-                if hours > 0:
-                    duration_str = f"{hours}:{minutes:02d}:{seconds:02d}"
-                else:
-                    duration_str = f"{minutes}:{seconds:02d}"
-            else:
-                duration_str = "Unknown"
-            
             # Edit message with video info
-            title = video_info.get('title', 'YouTube Video')[:50] + "..." if len(video_info.get('title', '')) > 50 else video_info.get('title', 'YouTube Video')
-            
+            title = video_info.get('title') or 'YouTube Video'
+            if len(title) > 50:
+                title = title[:50] + "..."
+            view_count = video_info.get('view_count')
+
             await processing_msg.edit_text(
-                f"✅ *Video Found!*\n\n"
-                f"📹 *Title:* {title}\n"
-                f"👤 *Uploader:* {video_info.get('uploader', 'Unknown')}\n"
-                f"⏱️ *Duration:* {duration_str}\n"
-                f"👁️ *Views:* {video_info.get('view_count', 'Unknown'):,}\n\n"
-                f"👇 *Select download quality:*",
+                _VIDEO_INFO_TMPL.format_map({
+                    'title': html.escape(title),
+                    'uploader': html.escape(video_info.get('uploader') or 'Unknown'),
+                    'duration': _format_duration(video_info.get('duration')),
+                    'views': f"{view_count:,}" if view_count is not None else "Unknown",
+                }),
                 reply_markup=reply_markup,
-                parse_mode='Markdown'
+                parse_mode=ParseMode.HTML
             )
             
         except Exception as e:
-            logger.error(f"Error processing video: {e}")
+            logger.error("Error processing video: %s", e)
             await processing_msg.edit_text(
-                f"❌ *Error:* {str(e)[:100]}\n\n"
+                f"❌ <b>Error:</b> {html.escape(str(e)[:100])}\n\n"
                 "Please try another video.",
-                parse_mode='Markdown'
+                parse_mode=ParseMode.HTML
             )
     
     async def handle_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle button callbacks"""
         query = update.callback_query
-        await query.answer()
-        
         data = query.data
-        user_id = query.from_user.id
-        
-        if data.startswith("example"):
-            await query.edit_message_text(
-                "📋 *Example YouTube Links:*\n\n"
-                "Regular video:\n"
-                "`https://www.youtube.com/watch?v=dQw4w9WgXcQ`\n\n"
-                "Short URL:\n"
-                "`https://youtu.be/dQw4w9WgXcQ`\n\n"
-                "YouTube Shorts:\n"
-                "`https://www.youtube.com/shorts/abc123`",
-                parse_mode='Markdown'
+
+        if data == "too_big":
+            await query.answer(
+                "⚠️ Too large for Telegram — choose a lower quality.",
+                show_alert=True
             )
-        
-        elif data.startswith("help"):
-            await self.help_command(update, context)
-        
+            return
+        await query.answer()
+
+        handler = self._cb_exact.get(data)
+        if handler is not None:
+            await handler(update, context)
         elif data.startswith("cancel_"):
             await query.edit_message_text(
-                "❌ *Download cancelled*\n\n"
+                "❌ <b>Download cancelled</b>\n\n"
                 "Send another YouTube link when you're ready!",
-                parse_mode='Markdown'
+                parse_mode=ParseMode.HTML
             )
-        
         elif data.startswith("dl_"):
-            # Extract quality and user_id
-            parts = data.split('_')
-            if len(parts) >= 3:
-                quality = parts[1]
-                callback_user_id = int(parts[2])
-                
-                if callback_user_id != user_id:
-                    await query.edit_message_text("This request is not for you!")
-                    return
-                
-                # Get video info for this user
-                video_info = self.user_data.get(user_id, {}).get('current_video', {})
-                if not video_info:
-                    await query.edit_message_text("Video info not found. Please send link again.")
+            await self._cb_download(update, context)
+
+    async def _cb_help(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Show the help guide in place of the pressed button's message"""
+        await update.callback_query.edit_message_text(
+            _HELP_TEXT, parse_mode=ParseMode.HTML
+        )
+
+    async def _cb_example(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Show example YouTube links"""
+        await update.callback_query.edit_message_text(
+            "📋 <b>Example YouTube Links:</b>\n\n"
+            "Regular video:\n"
+            "<code>https://www.youtube.com/watch?v=dQw4w9WgXcQ</code>\n\n"
+            "Short URL:\n"
+            "<code>https://youtu.be/dQw4w9WgXcQ</code>\n\n"
+            "YouTube Shorts:\n"
+            "<code>https://www.youtube.com/shorts/abc123</code>",
+            parse_mode=ParseMode.HTML
+        )
+
+    async def _cb_download(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Run a download picked from the quality menu"""
+        query = update.callback_query
+        data = query.data
+        user_id = query.from_user.id
+
+        # dl_<quality>_<user_id>; the bounded split keeps any '_' inside
+        # future id formats out of the quality field, and a malformed
+        # payload raises ValueError instead of needing a length check
+        try:
+            _, quality, callback_user_id = data.split('_', 2)
+            callback_user_id = int(callback_user_id)
+        except ValueError:
+            return
+
+        if callback_user_id != user_id:
+            await query.edit_message_text("This request is not for you!")
+            return
+
+        # Get video info for this user
+        video_ref = self.user_data.get(user_id)
+        if video_ref is None:
+            await query.edit_message_text("Video info not found. Please send link again.")
+            return
+
+        url = video_ref.url
+        video_title = video_ref.title
+
+        # Reject before downloading when the size is already known
+        expected = (video_ref.expected_sizes or {}).get(quality)
+        if expected and expected > MAX_FILE_SIZE:
+            await query.edit_message_text(
+                f"❌ <b>File Too Large</b>\n\n"
+                f"Expected size: {expected/(1024*1024):.2f} MB\n"
+                f"Max allowed: {MAX_FILE_SIZE/(1024*1024):.2f} MB\n\n"
+                "Please try a lower quality.",
+                parse_mode=ParseMode.HTML
+            )
+            return
+
+        # Quality labels
+        quality_labels = {
+            'best': '🎬 Best Quality',
+            '720': '📺 720p HD',
+            '480': '📱 480p',
+            '360': '⚡ 360p',
+            'audio': '🎵 Audio (m4a)'
+        }
+
+        quality_label = quality_labels.get(quality, quality.upper())
+
+        # Update message to show downloading
+        await query.edit_message_text(
+            f"⏬ <b>Downloading...</b>\n\n"
+            f"📹 <b>Title:</b> {html.escape(video_title[:40])}...\n"
+            f"🎬 <b>Quality:</b> {quality_label}\n\n"
+            f"⏳ <b>Status:</b> Starting download...",
+            parse_mode=ParseMode.HTML
+        )
+
+        # Download the video
+        try:
+            hook = self._make_progress_hook(
+                query, video_title, quality_label,
+                asyncio.get_running_loop()
+            )
+            result = await self.download_video(
+                url, quality, progress_hook=hook,
+                video_id=video_ref.video_id
+            )
+
+            if result is not None:
+                # Check file size
+                if result.size > MAX_FILE_SIZE:
+                    await query.edit_message_text(
+                        f"❌ <b>File Too Large</b>\n\n"
+                        f"Size: {result.size/(1024*1024):.2f} MB\n"
+                        f"Max allowed: {MAX_FILE_SIZE/(1024*1024):.2f} MB\n\n"
+                        "Please try a lower quality.",
+                        parse_mode=ParseMode.HTML
+                    )
+                    # Clean up
+                    Path(result.path).unlink(missing_ok=True)
                     return
-                
-                url = video_info['url']
-                video_title = video_info['title']
-                
-                # Quality labels
-                quality_labels = {
-                    'best': '🎬 Best Quality',
-                    '720': '📺 720p HD',
-                    '480': '📱 480p',
-                    '360': '⚡ 360p',
-                    'audio': '🎵 MP3 Audio'
-                }
-                
-                quality_label = quality_labels.get(quality, quality.upper())
-                
-                # Update message to show downloading
+
+                # Hand the upload off to a background task so this
+                # handler returns and the next download can start
+                # while the file is still being sent to Telegram.
+                task = asyncio.create_task(self._deliver_file(
+                    query, context, result.path, quality,
+                    quality_label, video_title, result.size
+                ))
+                self._bg_tasks.add(task)
+                task.add_done_callback(self._bg_tasks.discard)
+
+            else:
                 await query.edit_message_text(
-                    f"⏬ *Downloading...*\n\n"
-                    f"📹 *Title:* {video_title[:40]}...\n"
-                    f"🎬 *Quality:* {quality_label}\n"
-                    f"🔊 *Audio:* Crystal Clear\n\n"
-                    f"⏳ *Status:* Starting download...\n"
-                    f"📊 *Progress:* 0%\n"
-                    f"⏱️ *ETA:* Calculating...",
-                    parse_mode='Markdown'
+                    "❌ <b>Download failed</b>\n\n"
+                    "Could not download the video.\n"
+                    "Please try again or choose different quality.",
+                    parse_mode=ParseMode.HTML
                 )
-                
-                # Download the video
+
+        except Exception as e:
+            logger.error("Download error: %s", e)
+            await query.edit_message_text(
+                f"❌ <b>Download Error</b>\n\n"
+                f"Error: {html.escape(str(e)[:100])}\n\n"
+                "Please try again.",
+                parse_mode=ParseMode.HTML
+            )
+    
+    async def _get_mtproto(self):
+        """Lazily start the Telethon client used for parallel uploads"""
+        if TelegramClient is None or not (API_ID and API_HASH):
+            return None
+        async with self._mtproto_lock:
+            if self._mtproto is None and not self._mtproto_failed:
                 try:
-                    # Update progress
-                    await query.edit_message_text(
-                        f"⏬ *Downloading...*\n\n"
-                        f"📹 *Title:* {video_title[:40]}...\n"
-                        f"🎬 *Quality:* {quality_label}\n\n"
-                        f"⏳ *Status:* Downloading from YouTube...\n"
-                        f"📊 *Progress:* 25%\n"
-                        f"⏱️ *ETA:* 30 seconds",
-                        parse_mode='Markdown'
-                    )
-                    
-                    # Download video
-                    file_path = await self.download_video(url, quality, user_id)
-                    
-                    if file_path and os.path.exists(file_path):
-                        file_size = os.path.getsize(file_path)
-                        
-                        # Check file size
-                        if file_size > MAX_FILE_SIZE:
-                            await query.edit_message_text(
-                                f"❌ *File Too Large*\n\n"
-                                f"Size: {file_size/(1024*1024):.2f} MB\n"
-                                f"Max allowed: {MAX_FILE_SIZE/(1024*1024):.2f} MB\n\n"
-                                "Please try a lower quality.",
-                                parse_mode='Markdown'
-                            )
-                            # Clean up
-                            import shutil
-                            shutil.rmtree(os.path.dirname(file_path), ignore_errors=True)
-                            return
-                        
-                        # Update progress
-                        await query.edit_message_text(
-                            f"⏬ *Downloading...*\n\n"
-                            f"📹 *Title:* {video_title[:40]}...\n"
-                            f"🎬 *Quality:* {quality_label}\n\n"
-                            f"⏳ *Status:* Sending to Telegram...\n"
-                            f"📊 *Progress:* 75%\n"
-                            f"⏱️ *ETA:* 10 seconds",
-                            parse_mode='Markdown'
-                        )
-                        
-                        # Send file to user
-                        if quality == 'audio':
-                            # Send as audio
-                            with open(file_path, 'rb') as audio_file:
-                                await context.bot.send_audio(
-                                    chat_id=query.message.chat_id,
-                                    audio=InputFile(audio_file, filename=f"{video_title[:30]}.mp3"),
-                                    caption=f"✅ *Download Complete!*\n\n"
-                                           f"🎵 *Title:* {video_title}\n"
-                                           f"💾 *Size:* {file_size/(1024*1024):.2f} MB\n"
-                                           f"🔊 *Quality:* High Quality MP3",
-                                    parse_mode='Markdown'
-                                )
-                        else:
-                            # Send as video
-                            with open(file_path, 'rb') as video_file:
-                                await context.bot.send_video(
-                                    chat_id=query.message.chat_id,
-                                    video=InputFile(video_file, filename=f"{video_title[:30]}.mp4"),
-                                    caption=f"✅ *Download Complete!*\n\n"
-                                           f"📹 *Title:* {video_title}\n"
-                                           f"🎬 *Quality:* {quality_label}\n"
-                                           f"💾 *Size:* {file_size/(1024*1024):.2f} MB\n"
-                                           f"🔊 *Audio:* Crystal Clear",
-                                    parse_mode='Markdown',
-                                    supports_streaming=True
-                                )
-                        
-                        # Clean up
-                        import shutil
-                        shutil.rmtree(os.path.dirname(file_path), ignore_errors=True)
-                        
-                        # Final message
-                        await query.edit_message_text(
-                            f"✅ *Download Successful!*\n\n"
-                            f"Your video has been sent above!\n\n"
-                            f"Want to download another?\n"
-                            f"Just send me a new YouTube link! 🎬",
-                            parse_mode='Markdown'
-                        )
-                        
-                    else:
-                        await query.edit_message_text(
-                            "❌ *Download failed*\n\n"
-                            "Could not download the video.\n"
-                            "Please try again or choose different quality.",
-                            parse_mode='Markdown'
-                        )
-                        
+                    client = TelegramClient('bot_upload', int(API_ID), API_HASH)
+                    await client.start(bot_token=BOT_TOKEN)
                 except Exception as e:
-                    logger.error(f"Download error: {e}")
-                    await query.edit_message_text(
-                        f"❌ *Download Error*\n\n"
-                        f"Error: {str(e)[:100]}\n\n"
-                        "Please try again.",
-                        parse_mode='Markdown'
+                    # A broken MTProto setup must not break delivery —
+                    # callers treat None as "use the Bot API"
+                    self._mtproto_failed = True
+                    logger.warning(
+                        "MTProto client unavailable, uploads will use the Bot API: %s", e
                     )
-    
+                    return None
+                self._mtproto = client
+        return self._mtproto
+
+    async def _fast_upload(self, client, file_path, file_size, filename,
+                           workers=16):
+        """Upload a file as concurrent 512KB MTProto parts (FastTelethon pattern).
+
+        Each part is pread from disk in a worker thread only once its task
+        holds the semaphore, so the event loop never blocks on file I/O and
+        at most `workers` parts are in memory at a time.
+        """
+        part_size = 512 * 1024
+        total_parts = (file_size + part_size - 1) // part_size
+        file_id = random.getrandbits(63)
+        sem = asyncio.Semaphore(workers)
+        fd = os.open(file_path, os.O_RDONLY)
+
+        async def send_part(index):
+            async with sem:
+                chunk = await asyncio.to_thread(
+                    os.pread, fd, part_size, index * part_size
+                )
+                await client(SaveBigFilePartRequest(file_id, index, total_parts, chunk))
+
+        try:
+            await asyncio.gather(*(send_part(i) for i in range(total_parts)))
+        finally:
+            os.close(fd)
+        return InputFileBig(file_id, total_parts, filename)
+
+    async def _deliver_file(self, query, context, file_path, quality,
+                            quality_label, video_title, file_size):
+        """Upload a finished download to Telegram, then clean up"""
+        try:
+            await query.edit_message_text(
+                f"⏬ <b>Downloading...</b>\n\n"
+                f"📹 <b>Title:</b> {html.escape(video_title[:40])}...\n"
+                f"🎬 <b>Quality:</b> {quality_label}\n\n"
+                f"⏳ <b>Status:</b> Sending to Telegram...",
+                parse_mode=ParseMode.HTML
+            )
+
+            ext = 'm4a' if quality == 'audio' else 'mp4'
+            filename = f"{_safe_title(video_title)[:30]}.{ext}"
+
+            sent = False
+            client = await self._get_mtproto()
+            if client is not None:
+                # Fast path: parallel MTProto upload, then send by file handle
+                try:
+                    uploaded = await self._fast_upload(
+                        client, file_path, file_size, filename
+                    )
+                    await client.send_file(
+                        query.message.chat_id,
+                        uploaded,
+                        caption=f"✅ <b>Download Complete!</b>\n\n"
+                                f"📹 <b>Title:</b> {html.escape(video_title)}\n"
+                                f"🎬 <b>Quality:</b> {quality_label}\n"
+                                f"💾 <b>Size:</b> {file_size/(1024*1024):.2f} MB",
+                        parse_mode='html',
+                        supports_streaming=(quality != 'audio')
+                    )
+                    sent = True
+                except Exception as e:
+                    # MTProto can fail where the Bot API still works (e.g.
+                    # entity resolution for a chat this session never saw);
+                    # delivery must not get worse because credentials exist
+                    logger.warning("MTProto upload failed, using Bot API: %s", e)
+
+            if sent:
+                pass
+            elif quality == 'audio':
+                # Send as audio; passing the path lets the library stream the
+                # file instead of blocking the event loop on a full read
+                await context.bot.send_audio(
+                    chat_id=query.message.chat_id,
+                    audio=Path(file_path),
+                    filename=filename,
+                    caption=f"✅ <b>Download Complete!</b>\n\n"
+                           f"🎵 <b>Title:</b> {html.escape(video_title)}\n"
+                           f"💾 <b>Size:</b> {file_size/(1024*1024):.2f} MB\n"
+                           f"🔊 <b>Quality:</b> High Quality Audio",
+                    parse_mode=ParseMode.HTML
+                )
+            else:
+                # Send as video
+                await context.bot.send_video(
+                    chat_id=query.message.chat_id,
+                    video=Path(file_path),
+                    filename=filename,
+                    caption=f"✅ <b>Download Complete!</b>\n\n"
+                           f"📹 <b>Title:</b> {html.escape(video_title)}\n"
+                           f"🎬 <b>Quality:</b> {quality_label}\n"
+                           f"💾 <b>Size:</b> {file_size/(1024*1024):.2f} MB\n"
+                           f"🔊 <b>Audio:</b> Crystal Clear",
+                    parse_mode=ParseMode.HTML,
+                    supports_streaming=True
+                )
+
+            # Final message
+            await query.edit_message_text(
+                f"✅ <b>Download Successful!</b>\n\n"
+                f"Your video has been sent above!\n\n"
+                f"Want to download another?\n"
+                f"Just send me a new YouTube link! 🎬",
+                parse_mode=ParseMode.HTML
+            )
+
+        except Exception as e:
+            logger.error("Upload error: %s", e)
+            try:
+                await query.edit_message_text(
+                    f"❌ <b>Upload Error</b>\n\n"
+                    f"Error: {html.escape(str(e)[:100])}\n\n"
+                    "Please try again.",
+                    parse_mode=ParseMode.HTML
+                )
+            except Exception:
+                pass
+        finally:
+            # Clean up
+            Path(file_path).unlink(missing_ok=True)
+
     async def error_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle errors"""
-        logger.error(f"Error: {context.error}")
+        logger.error("Error: %s", context.error)
         
         try:
             if update and update.effective_chat:
                 await context.bot.send_message(
                     chat_id=update.effective_chat.id,
-                    text="❌ *An error occurred*\n\nPlease try again or send /start",
-                    parse_mode='Markdown'
+                    text="❌ <b>An error occurred</b>\n\nPlease try again or send /start",
+                    parse_mode=ParseMode.HTML
                 )
         except:
             pass
     
     def run(self):
         """Start the bot"""
+        async def post_init(app):
+            # asyncio.to_thread runs on the default executor; widen it so
+            # concurrent downloads and extractions don't queue behind the
+            # small default thread pool
+            asyncio.get_running_loop().set_default_executor(
+                ThreadPoolExecutor(max_workers=32)
+            )
+
         # Create application
-        app = Application.builder().token(BOT_TOKEN).build()
+        app = Application.builder().token(BOT_TOKEN).post_init(post_init).build()
         
         # Add handlers
         app.add_handler(CommandHandler("start", self.start_command))